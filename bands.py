@@ -35,18 +35,33 @@ __version__ = '0.1.3'
 __description__ = 'Another message passing library.'
 __license__ = 'MIT'
 
-from collections import defaultdict
-import inspect
+from types import MappingProxyType
 import weakref
 
 
+_EMPTY = MappingProxyType({})
+_ID_NONE = id(None)
+_PURGE_THRESHOLD = 64
+
+# Kinds of references stored by WeakSet
+_FUNC = 0
+_METHOD = 1
+_STRONG = 2
+
+
 class WeakRef(weakref.ref):
     '''Same as weakref.ref but supports attribute assignment.'''
 
+    __slots__ = ('ref_id', 'key')
+    kind = _FUNC
+
 
 class WeakMeth(object):
     '''weakref.ref for methods.'''
 
+    __slots__ = ('name', 'ref', 'ref_id')
+    kind = _METHOD
+
     def __init__(self, obj, callback=None):
         self.name = obj.__name__
         self.ref = WeakRef(obj.__self__, callback)
@@ -61,6 +76,9 @@ class WeakMeth(object):
 class StrongRef(object):
     '''Hold a reference to an object.'''
 
+    __slots__ = ('name', 'obj', 'ref_id')
+    kind = _STRONG
+
     def __init__(self, obj, callback=None):
         self.name = obj.__name__
         self.obj = obj
@@ -71,77 +89,90 @@ class StrongRef(object):
 
 class WeakSet(object):
     '''A weakset implementation that supports methods. The underlying
-    data is stored as list so it will remain ordered unlike a true set.
+    data is stored as an insertion ordered dict so it will remain ordered
+    unlike a true set.
+
+    References to dead objects are dropped lazily while iterating rather than
+    by weakref callbacks, so len may include dead references until the
+    WeakSet is next iterated.
     '''
 
+    __slots__ = ('_refs', '__weakref__')
+
     def __init__(self, iterator=None):
-        self._refs = []
-        self._ids = []
+        self._refs = {}
 
         if iterator is not None:
             for item in iterator:
                 self.add(item)
 
     def __len__(self):
-        return len(self._ids)
+        return len(self._refs)
 
     def __contains__(self, obj):
-        return (
-            obj in self._ids or
-            obj in self._refs or
-            self._ref_id(obj) in self._ids
-        )
+        ref = self._refs.get(self._ref_id(obj))
+        return ref is not None and ref() is not None
 
     def __iter__(self):
-        for ref in self._refs:
-            obj = ref()
-            if obj is None:
-                continue
-            yield obj
+        dead = []
+
+        # Dereference inline by kind to skip a python frame per receiver
+        for ref in list(self._refs.values()):
+            kind = ref.kind
+            if kind == _FUNC:
+                obj = ref()
+                if obj is None:
+                    dead.append(ref)
+                    continue
+                yield obj
+            elif kind == _METHOD:
+                inst = ref.ref()
+                if inst is None:
+                    dead.append(ref)
+                    continue
+                yield getattr(inst, ref.name)
+            else:
+                yield ref.obj
+
+        for ref in dead:
+            if self._refs.get(ref.ref_id) is ref:
+                del self._refs[ref.ref_id]
 
     def _ref_id(self, obj):
-        if is_method(obj):
-            if hasattr(obj, '__func__'):
-                return id(obj.__self__), id(obj.__func__)
-            return id(obj.__self__), id(obj.__name__)
-        else:
+        im_self = getattr(obj, '__self__', None)
+        if im_self is None:
             return id(obj)
 
-    def _remove_ref(self, ref):
-        ref_id = ref.ref_id
-        if ref_id not in self._ids:
-            return
-
-        index = self._ids.index(ref_id)
-        self._ids.pop(index)
-        self._refs.pop(index)
+        # Builtin methods have no __func__, key them by name instead
+        im_func = getattr(obj, '__func__', None)
+        if im_func is None:
+            return id(im_self), obj.__name__
+        return id(im_self), id(im_func)
 
     def add(self, obj, strong=False):
         ref_id = self._ref_id(obj)
-        if ref_id in self._ids:
-            return
+        ref = self._refs.get(ref_id)
+        if ref is not None:
+            if ref() is not None:
+                return
+
+            # ref_id was reused by a new object, drop the dead reference
+            del self._refs[ref_id]
 
-        self._ids.append(ref_id)
         if strong:
             ref = StrongRef(obj)
-            ref.ref_id = ref_id
-        elif is_method(obj):
-            ref = WeakMeth(obj, self._remove_ref)
-            ref.ref.ref_id = ref_id
+        elif isinstance(ref_id, tuple):
+            ref = WeakMeth(obj)
         else:
-            ref = WeakRef(obj, self._remove_ref)
-            ref.ref_id = ref_id
+            ref = WeakRef(obj)
+        ref.ref_id = ref_id
 
-        self._refs.append(ref)
+        self._refs[ref_id] = ref
 
     def discard(self, obj):
         ref_id = self._ref_id(obj)
-        if ref_id not in self._ids:
-            return
-
-        index = self._ids.index(ref_id)
-        self._ids.pop(index)
-        self._refs.pop(index)
+        if ref_id in self._refs:
+            del self._refs[ref_id]
 
 
 class Context(object):
@@ -150,7 +181,7 @@ class Context(object):
 
     Attributes:
         identifier (str): Channel identifier
-        receivers (WeakSet): List of receivers
+        receivers (list): List of receivers
         args (tuple): Arguments to send to receivers
         kwargs (dict): Kwargs to send to receivers
         results (list): List of results from executing receivers
@@ -159,7 +190,7 @@ class Context(object):
     def __init__(self, identifier, receivers, *args, **kwargs):
 
         self.identifier = identifier
-        self.receivers = WeakSet(receivers)
+        self.receivers = receivers
         self.args = args
         self.kwargs = kwargs
         self.results = []
@@ -179,27 +210,58 @@ class Dispatcher(object):
     execute code before and after executing receivers. This is a good
     place to perform logging, broadcast signals across tcp or store
     them in a database. before_dispatch and after_dispatch take a Context
-    object as an argument.
+    object as an argument. Hooks and dispatch overrides are detected when a
+    subclass is defined, so they must be defined in the class body rather
+    than assigned to the class or an instance later.
 
     To fully customize a Dispatcher override the _dispatch method. The
-    _dispatch method accepts a Channel's identifier, receivers and the
-    args and kwargs being sent. The _dispatch method is expected to execute
-    all receivers with the provided args and kwargs and return a list of
-    results.
+    _dispatch method accepts a Channel's identifier, a list of receivers and
+    the args tuple and kwargs dict being sent. The _dispatch method is
+    expected to execute all receivers with the provided args and kwargs and
+    return a list of results.
     '''
 
-    def _dispatch(self, identifier, receivers, *args, **kwargs):
+    _has_before = False
+    _has_after = False
+    _has_dispatch = False
+    _passthrough = True
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        cls._has_before = hasattr(cls, 'before_dispatch')
+        cls._has_after = hasattr(cls, 'after_dispatch')
+        cls._has_dispatch = cls.dispatch is not Dispatcher.dispatch
+        cls._passthrough = not (
+            cls._has_before or
+            cls._has_after or
+            cls._has_dispatch or
+            cls._dispatch is not Dispatcher._dispatch
+        )
+
+    def _dispatch(self, identifier, receivers, args, kwargs):
 
-        ctx = Context(identifier, receivers, args, kwargs)
+        if not (self._has_before or self._has_after):
+            if not self._has_dispatch:
+                return [receiver(*args, **kwargs) for receiver in receivers]
+            return [
+                self.dispatch(identifier, receiver, *args, **kwargs)
+                for receiver in receivers
+            ]
 
-        if hasattr(self, 'before_dispatch'):
+        ctx = Context(identifier, receivers)
+        ctx.args, ctx.kwargs = args, kwargs
+
+        if self._has_before:
             self.before_dispatch(ctx)
 
         for receiver in ctx.receivers:
-            result = self.dispatch(identifier, receiver, *args, **kwargs)
+            if self._has_dispatch:
+                result = self.dispatch(identifier, receiver, *args, **kwargs)
+            else:
+                result = receiver(*args, **kwargs)
             ctx.results.append(result)
 
-        if hasattr(self, 'after_dispatch'):
+        if self._has_after:
             self.after_dispatch(ctx)
 
         return ctx.results
@@ -225,59 +287,114 @@ class Band(object):
     def __init__(self, dispatcher=None):
         self.dispatcher = dispatcher or DEFAULT_DISPATCHER
         self.channels = {}
-        self.by_parent = defaultdict(dict)
-        self.by_identifier = defaultdict(list)
+        self._created = 0
+        self._purge_size = _PURGE_THRESHOLD
+
+    @property
+    def dispatcher(self):
+        return self._dispatcher
+
+    @dispatcher.setter
+    def dispatcher(self, dispatcher):
+        self._dispatcher = dispatcher
+
+        # When the Dispatcher simply calls receivers, sends can skip
+        # Band.dispatch and call receivers directly
+        self._fast_send = (
+            getattr(dispatcher, '_passthrough', False) and
+            type(self).dispatch is Band.dispatch
+        )
 
     def _remove_channel(self, ref):
         '''Cleanup a channel after it's reference dies'''
 
         identifier, parent_id = ref.key
-        if ref.key in self.by_identifier[identifier]:
-            self.by_identifier[identifier].remove(ref.key)
-        self.by_parent[parent_id].pop(identifier, None)
-        self.channels.pop(ref.key, None)
+        peers = self.channels.get(identifier, _EMPTY)
+        if peers.get(parent_id) is ref:
+            del peers[parent_id]
+            if not peers:
+                del self.channels[identifier]
+
+    def _purge_channels(self):
+        '''Cleanup all channels whose references have died.
+
+        Band does not use weakref callbacks, instead dead channels are purged
+        whenever more channels have been created since the last purge than
+        were alive after it.
+        '''
 
-    def send(self, identifier, *args, **kwargs):
+        alive = 0
+        for peers in list(self.channels.values()):
+            for ref in list(peers.values()):
+                if ref() is None:
+                    self._remove_channel(ref)
+                else:
+                    alive += 1
+        self._created = 0
+        self._purge_size = max(alive, _PURGE_THRESHOLD)
+
+    def send(self, identifier, *args, parent=None, **kwargs):
         '''Send a message to a channel with the given identifier.'''
 
-        parent = kwargs.pop('parent', None)
         chan = self.channel(identifier, parent)
+
+        # Nothing to dispatch when the Dispatcher simply calls receivers and
+        # neither chan nor the peers it sends to have receivers
+        if self._fast_send and not chan.receivers:
+            peers = self.channels[identifier]
+            if chan.bound:
+                ref = peers.get(_ID_NONE)
+                any_chan = ref() if ref is not None else None
+                if any_chan is None or not any_chan.receivers:
+                    return []
+            elif len(peers) == 1:
+                return []
+
         return chan.send(*args, **kwargs)
 
-    def dispatch(self, identifier, receivers, *args, **kwargs):
+    def dispatch(self, identifier, receivers, args, kwargs):
         '''Executes a receiver using this Band's Dispatcher'''
+        if not isinstance(receivers, list):
+            receivers = list(receivers)
         return self.dispatcher._dispatch(
             identifier,
             receivers,
-            *args,
-            **kwargs
+            args,
+            kwargs
         )
 
     def get_channel_receivers(self, chan):
         '''Get all receivers for the provided channel.
 
-        If the channel is bound, yield the bound Channel's receivers
+        If the channel is bound, return the bound Channel's receivers
         plus any anonymous receivers connected to an unbound Channel with the
         same identifier.
 
-        If the channel is unbound, yield receivers connected to all unbound
+        If the channel is unbound, return receivers connected to all unbound
         and bound Channels with the same identifier.
+
+        Returns:
+            list of receivers
         '''
 
+        receivers = list(chan.receivers)
+        peers = self.channels.get(chan.identifier, _EMPTY)
         if chan.bound:
-            yield chan.receivers
-            key = chan.identifier, id(None)
-            if key in self.channels:
-                any_chan = self.channels[(chan.identifier, id(None))]()
-                if any_chan:
-                    yield any_chan.receivers
+            ref = peers.get(_ID_NONE)
+            if ref is not None:
+                any_chan = ref()
+                if any_chan is not None:
+                    receivers.extend(any_chan.receivers)
         else:
-            yield chan.receivers
-            for key in self.by_identifier[chan.identifier]:
-                other_chan = self.channels[key]()
+            for ref in list(peers.values()):
+                other_chan = ref()
+                if other_chan is None:
+                    self._remove_channel(ref)
+                    continue
                 if other_chan is chan:
                     continue
-                yield other_chan.receivers
+                receivers.extend(other_chan.receivers)
+        return receivers
 
     def channel(self, identifier, parent=None):
         '''Get a Channel instance for the provided identifier. If a parent is
@@ -291,15 +408,22 @@ class Band(object):
             unbound or bound Channel
         '''
 
-        key = (identifier, id(parent))
-        if key not in self.channels:
-            chan = Channel(identifier, parent, self)
-            ref = WeakRef(chan, self._remove_channel)
-            ref.key = key
-            self.channels[key] = ref
-            self.by_parent[id(parent)][identifier] = key
-            self.by_identifier[identifier].append(key)
-        return self.channels[key]()
+        parent_id = _ID_NONE if parent is None else id(parent)
+        ref = self.channels.get(identifier, _EMPTY).get(parent_id)
+        if ref is not None:
+            chan = ref()
+            if chan is not None:
+                return chan
+
+        chan = Channel(identifier, parent, self)
+        ref = WeakRef(chan)
+        ref.key = (identifier, parent_id)
+        self.channels.setdefault(identifier, {})[parent_id] = ref
+
+        self._created += 1
+        if self._created > self._purge_size:
+            self._purge_channels()
+        return chan
 
 
 class Channel(object):
@@ -324,14 +448,21 @@ class Channel(object):
     get the same bound Channel instance.
     '''
 
+    __slots__ = (
+        'identifier',
+        '_parent',
+        'band',
+        'receivers',
+        '_names',
+        '__weakref__',
+    )
+
     def __init__(self, identifier, parent=None, band=None):
         self.identifier = identifier
-        if parent:
-            self.parent = weakref.proxy(parent)
-        else:
-            self.parent = parent
+        self._parent = WeakRef(parent) if parent is not None else None
         self.band = band or get_band()
         self.receivers = WeakSet()
+        self._names = None
 
     def __get__(self, obj, type):
         if obj is None:
@@ -340,12 +471,38 @@ class Channel(object):
         chan = self.band.channel(self.identifier, obj)
 
         # Bind this descriptor to the class instance
-        for name, member in inspect.getmembers(type):
-            if member is self:
-                setattr(obj, name, chan)
+        for name in self._get_names(type):
+            setattr(obj, name, chan)
 
         return chan
 
+    def __set_name__(self, owner, name):
+        if self._names is None:
+            self._names = weakref.WeakKeyDictionary()
+        self._names[owner] = self._names.get(owner, ()) + (name,)
+
+    def _get_names(self, type):
+        '''Get the attribute names this descriptor is assigned to in type'''
+
+        if self._names is not None:
+            for klass in type.__mro__:
+                names = self._names.get(klass)
+                if names:
+                    return names
+
+        # Descriptor was assigned after class creation
+        for klass in type.__mro__:
+            names = tuple(
+                name for name, member in klass.__dict__.items()
+                if member is self
+            )
+            if names:
+                if self._names is None:
+                    self._names = weakref.WeakKeyDictionary()
+                self._names[klass] = names
+                return names
+        return ()
+
     def __repr__(self):
         return '<{} {} at 0x{}>(identifier={!r})'.format(
             ('unbound', 'bound')[self.bound],
@@ -355,25 +512,51 @@ class Channel(object):
         )
 
     def get_receivers(self):
-        for receivers in self.band.get_channel_receivers(self):
-            for receiver in receivers:
-                yield receiver
+        return self.band.get_channel_receivers(self)
+
+    @property
+    def parent(self):
+        if self._parent is not None:
+            return self._parent()
 
     @property
     def bound(self):
-        return self.parent is not None
+        return self._parent is not None
 
     def send(self, *args, **kwargs):
-        return self.band.dispatch(
+        band = self.band
+        if band._fast_send:
+            return [r(*args, **kwargs) for r in self.get_receivers()]
+        return band.dispatch(
             self.identifier,
             self.get_receivers(),
-            *args, **kwargs
+            args,
+            kwargs
         )
 
+    @property
+    def frozen(self):
+        return isinstance(self.receivers, tuple)
+
+    def freeze(self):
+        '''Replace this Channel's receivers with a tuple of strong references
+        to the currently live receivers. Sending through a frozen Channel
+        skips all weakref dereferencing, which is useful for hot Channels
+        with long-lived receivers. Frozen Channels can not be connected to
+        or disconnected from.
+        '''
+
+        if not self.frozen:
+            self.receivers = tuple(self.receivers)
+
     def connect(self, obj, strong=False):
+        if self.frozen:
+            raise RuntimeError('Can not connect to a frozen Channel.')
         self.receivers.add(obj, strong)
 
     def disconnect(self, obj):
+        if self.frozen:
+            raise RuntimeError('Can not disconnect from a frozen Channel.')
         self.receivers.discard(obj)
 
 
@@ -419,7 +602,7 @@ def channel(identifier, parent=None, band=None):
     return band.channel(identifier, parent)
 
 
-def send(identifier, *args, **kwargs):
+def send(identifier, *args, parent=None, band=None, **kwargs):
     '''Send a message to a Channel with the given identifier and parent in
     the active band. If no parent is provided, broadcasts *args and **kwargs
     to all unbound and bound receivers for identifier.
@@ -427,13 +610,14 @@ def send(identifier, *args, **kwargs):
     Arguments:
         identifier (str): Identifier of Channel like "started"
         parent (obj): Parent of Channel to send to
+        band (Band): Band to send through, defaults to the active band
 
     Returns:
         list of results
     '''
 
-    band = kwargs.pop('band', ACTIVE_BAND)
-    return band.send(identifier, *args, **kwargs)
+    band = band or ACTIVE_BAND
+    return band.send(identifier, *args, parent=parent, **kwargs)
 
 
 def is_dispatcher(obj):
@@ -449,4 +633,4 @@ def is_channel(obj):
 
 
 def is_method(obj):
-    return hasattr(obj, '__call__') and hasattr(obj, '__self__')
+    return callable(obj) and getattr(obj, '__self__', None) is not None
@@ -12,6 +12,7 @@ setup(
     url=bands.__url__,
     license=bands.__license__,
     py_modules=['bands'],
+    python_requires='>=3.7',
     classifiers=(
         "Development Status :: 3 - Alpha",
         "Intended Audience :: Developers",
@@ -19,8 +20,8 @@ setup(
         "Natural Language :: English",
         "Operating System :: OS Independent",
         "Programming Language :: Python",
-        'Programming Language :: Python :: 2',
         'Programming Language :: Python :: 3',
+        'Programming Language :: Python :: 3 :: Only',
         "Topic :: Software Development :: Libraries :: Python Modules",
     )
 )
@@ -1,4 +1,17 @@
-from bands import channel
+import gc
+import io
+import weakref
+
+from bands import (
+    Band,
+    Dispatcher,
+    WeakRef,
+    WeakSet,
+    _PURGE_THRESHOLD,
+    channel,
+    is_method,
+    send,
+)
 
 
 class Component(object):
@@ -128,3 +141,265 @@ def test_strongref():
     strong = list(chan.receivers)[0]
     chan.disconnect(strong)
     assert chan.send() == []
+
+
+def test_dispatcher_hooks():
+    '''Test before_dispatch and after_dispatch hooks'''
+
+    contexts = []
+
+    class RecordingDispatcher(Dispatcher):
+        def before_dispatch(self, ctx):
+            # Hooks can attach their own state to the Context
+            ctx.sent = True
+            contexts.append(('before', ctx.identifier, ctx.args, ctx.kwargs))
+
+        def after_dispatch(self, ctx):
+            assert ctx.sent
+            contexts.append(('after', ctx.identifier, ctx.results))
+
+    def receiver(value, extra=None):
+        return value, extra
+
+    band = Band(RecordingDispatcher())
+    chan = band.channel('hooked')
+    chan.connect(receiver)
+
+    assert chan.send(1, extra=2) == [(1, 2)]
+    assert contexts == [
+        ('before', 'hooked', (1,), {'extra': 2}),
+        ('after', 'hooked', [(1, 2)]),
+    ]
+
+    # Replacing a Band's dispatcher takes effect immediately
+    band.dispatcher = Dispatcher()
+    assert chan.send(3) == [(3, None)]
+    assert len(contexts) == 2
+    band.dispatcher = RecordingDispatcher()
+    assert chan.send(4) == [(4, None)]
+    assert len(contexts) == 4
+
+    # kwargs named like Context arguments reach receivers untouched
+    def named(identifier=None, receivers=None):
+        return identifier, receivers
+
+    other = band.channel('named')
+    other.connect(named)
+    assert other.send(identifier=1, receivers=2) == [(1, 2)]
+    assert contexts[-2] == (
+        'before', 'named', (), {'identifier': 1, 'receivers': 2}
+    )
+
+    # The default Dispatcher has no hooks
+    assert not Dispatcher._has_before
+    assert not Dispatcher._has_after
+
+
+def test_frozen_channel():
+    '''Test frozen channels'''
+
+    def receiver():
+        return 'receiver'
+
+    chan = channel('frozen')
+    chan.connect(receiver)
+    chan.freeze()
+    assert chan.frozen
+
+    # Frozen channels hold strong references to their receivers
+    del(receiver)
+    assert chan.send() == ['receiver']
+
+    # Frozen channels can not be modified
+    for method, obj in ((chan.connect, len), (chan.disconnect, len)):
+        try:
+            method(obj)
+        except RuntimeError:
+            pass
+        else:
+            assert False, 'Frozen channel was modified'
+
+
+def test_builtin_method():
+    '''Test connecting bound builtin methods'''
+
+    stream = io.StringIO()
+    assert is_method(stream.write)
+
+    chan = channel('builtin')
+    chan.connect(stream.write)
+    assert stream.write in chan.receivers
+    assert chan.send('hi') == [2]
+    assert stream.getvalue() == 'hi'
+
+    chan.disconnect(stream.write)
+    assert chan.send('hi') == []
+
+    # Builtin methods of objects that can not be weakly referenced raise
+    try:
+        chan.connect([].append)
+    except TypeError:
+        pass
+    else:
+        assert False, 'Connected a method that can not be weakly referenced'
+
+
+def test_custom_dispatch():
+    '''Test overriding Dispatcher._dispatch'''
+
+    class CustomDispatcher(Dispatcher):
+        def _dispatch(self, identifier, receivers, args, kwargs):
+            return ['custom'] + [r(*args, **kwargs) for r in receivers]
+
+    band = Band(CustomDispatcher())
+    chan = band.channel('custom')
+
+    # _dispatch runs even when there are no receivers
+    assert chan.send() == ['custom']
+    assert band.send('custom') == ['custom']
+
+    class DuckDispatcher(object):
+        def _dispatch(self, identifier, receivers, args, kwargs):
+            return ['duck'] + [r(*args, **kwargs) for r in receivers]
+
+    # Dispatchers do not need to subclass Dispatcher
+    band = Band(DuckDispatcher())
+    assert band.channel('duck').send() == ['duck']
+    assert band.send('duck') == ['duck']
+
+
+def test_dead_references():
+    '''Test lazy cleanup of dead references'''
+
+    class Obj(object):
+        pass
+
+    def dead_ref(ref_id):
+        obj = Obj()
+        ref = WeakRef(obj)
+        ref.ref_id = ref_id
+        del(obj)
+        return ref
+
+    def receiver():
+        return 'receiver'
+
+    # A dead reference stored under a reused id does not count as connected
+    ws = WeakSet()
+    ws._refs[id(receiver)] = dead_ref(id(receiver))
+    assert receiver not in ws
+
+    # Reconnecting replaces the dead reference
+    ws.add(receiver)
+    assert receiver in ws
+    assert list(ws) == [receiver]
+
+    # Dead references are counted until the WeakSet is iterated
+    other = lambda: None
+    ws.add(other)
+    del(other)
+    assert len(ws) == 2
+    assert list(ws) == [receiver]
+    assert len(ws) == 1
+
+    # Band purges dead channels once enough channels have been created
+    band = Band()
+    for i in range(_PURGE_THRESHOLD):
+        band.channel('dead_%d' % i)
+    assert len(band.channels) == _PURGE_THRESHOLD
+    chan = band.channel('alive')
+    assert list(band.channels) == ['alive']
+    assert band.channels['alive'][id(None)]() is chan
+
+
+def test_channel_descriptor_names():
+    '''Test binding Channel descriptors under different names'''
+
+    shared = channel('shared')
+
+    class First(object):
+        first = shared
+
+    class Second(object):
+        second = shared
+
+    class Child(First):
+        pass
+
+    # The same unbound Channel binds under each class's attribute name
+    first, second, child = First(), Second(), Child()
+    assert first.first is first.first
+    assert 'first' in vars(first)
+    assert second.second is second.second
+    assert 'second' in vars(second)
+
+    # Subclasses resolve the name through the MRO
+    assert child.first is child.first
+    assert 'first' in vars(child)
+    assert child.first is not first.first
+
+    # A Channel assigned under two names binds both names
+    class Aliased(object):
+        one = two = channel('aliased')
+
+    aliased = Aliased()
+    assert aliased.one is aliased.two
+    assert 'one' in vars(aliased) and 'two' in vars(aliased)
+
+    # Channels do not keep the classes they are assigned to alive
+    def make_class():
+        class Dynamic(object):
+            dynamic = shared
+        Dynamic().dynamic
+        return weakref.ref(Dynamic)
+
+    dynamic_ref = make_class()
+    gc.collect()
+    assert dynamic_ref() is None
+
+    # Channels assigned after the class is created are found by scanning
+    class Late(object):
+        pass
+
+    Late.late = channel('late')
+    late = Late()
+    assert late.late is late.late
+    assert 'late' in vars(late)
+
+
+def test_channel_parent():
+    '''Test Channel.parent'''
+
+    class Parent(object):
+        pass
+
+    class Falsy(object):
+        def __bool__(self):
+            return False
+
+    parent = Parent()
+    chan = channel('parented', parent)
+    assert chan.bound
+    assert chan.parent is parent
+
+    # parent becomes None once the parent is deleted
+    del(parent)
+    gc.collect()
+    assert chan.parent is None
+
+    # Falsy parents still produce bound Channels
+    falsy = Falsy()
+    chan = channel('parented', falsy)
+    assert chan.bound
+    assert chan.parent is falsy
+
+    # Sending to a bound Channel without receivers still reaches
+    # receivers of the unbound Channel
+    unbound = channel('parented')
+    unbound.connect(Falsy.__bool__, strong=True)
+    assert send('parented', falsy, parent=falsy) == [False]
+    unbound.disconnect(Falsy.__bool__)
+    assert send('parented', falsy, parent=falsy) == []
+
+    # Unbound Channels have no parent
+    assert channel('parented').parent is None